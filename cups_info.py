@@ -3,6 +3,7 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six import reraise
 
 ANSIBLE_METADATA = {
     'metadata_version': '0.1',
@@ -27,6 +28,20 @@ options:
         description:
             - The username used to connect to CUPS module
         required: false
+    workers:
+        description:
+            - Number of concurrent CUPS connections used to gather info.
+            - With C(1) every request is done one after another on a single
+              connection. Higher values overlap the per-queue attribute
+              fetches and the server-wide PPD, device and dest requests.
+            - No more connections are opened than there are requests to
+              make.
+            - Output is the same whatever the number of workers, including
+              the partial result returned when a request fails.
+            - Must be between C(1) and C(32).
+        required: false
+        default: 1
+        type: int
 
 author:
     - Robert Pouliot (@robertpouliot)
@@ -41,6 +56,11 @@ EXAMPLES = '''
 - name: Get CUPS fact with user cupsadm
   cups_info:
     user: cupsadm
+
+# Gather info from a slow or remote CUPS host with 4 connections
+- name: Get CUPS info concurrently
+  cups_info:
+    workers: 4
 '''
 
 RETURN = '''
@@ -61,19 +81,180 @@ ppds:
     type: dict
 '''
 
+import sys
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 try:
     import cups
     HAS_CUPS = True
 except ImportError:
     HAS_CUPS = False
 
+MAX_WORKERS = 32
+
+printer_state = ['Unknown0', 'Unknown1', 'Unknown2',
+                 'Idle', 'Processing', 'Stopped']
+
+print_arg = [
+    ['status_message', 'printer-state-message'],
+    ['location', 'printer-location'],
+    ['info', 'printer-info'],
+    ['type', 'printer-type'],
+    ['shared', 'printer-is-shared'],
+    ['uri', 'device-uri'],
+    ['model', 'printer-make-and-model']
+]
+
+print_attr_arg = [
+    ['color', 'color-supported', False],
+    ['duplex', 'sides-supported', ['one-sided']],
+    ['media_default', 'media-default', ''],
+    ['op_policy', 'printer-op-policy', 'default'],
+    ['error_policy', 'printer-error-policy', 'stop-printer']
+]
+
+class CupsConnectionPool(object):
+    """Small set of CUPS connections shared by the gathering threads.
+
+    Connections past the first one are only opened when a thread asks for
+    one and none is free, so no more than size connections are ever open.
+    If the server refuses a new connection, the pool stops growing.
+    """
+
+    def __init__(self, conn, size):
+        self.conns = queue.Queue()
+        self.conns.put(conn)
+        self.opened = 1
+        self.size = size
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            grow = self.conns.empty() and self.opened < self.size
+            if grow:
+                self.opened += 1
+        if grow:
+            try:
+                return cups.Connection()
+            except Exception:
+                # The server refuses more connections, wait for one of
+                # those already open instead
+                with self.lock:
+                    self.opened -= 1
+                    self.size = self.opened
+        return self.conns.get()
+
+    def release(self, conn):
+        self.conns.put(conn)
+
+def cups_run_tasks(pool, workers, tasks, user, results):
+    """Run tasks (list of (key, func(conn))) and store their results by key.
+
+    With one worker the tasks are run in order on a single connection.
+    Otherwise they are spread over workers threads, each borrowing a
+    connection from the pool for each task.  libcups keeps the user per
+    thread, so every thread sets it before its first request.  If any task
+    fails, tasks after it are skipped, only the results of the tasks before
+    it are kept and its error is raised, the same as in serial mode
+    whatever the thread scheduling.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        conn = pool.acquire()
+        try:
+            for key, func in tasks:
+                results[key] = func(conn)
+        finally:
+            pool.release(conn)
+        return results
+
+    pending = queue.Queue()
+    for index, task in enumerate(tasks):
+        pending.put((index, task))
+    errors = dict()
+    lock = threading.Lock()
+
+    def worker():
+        if user:
+            cups.setUser(user)
+        while True:
+            try:
+                index, (key, func) = pending.get_nowait()
+            except queue.Empty:
+                return
+            with lock:
+                # Results after the first failing task are thrown away
+                if errors and index > min(errors):
+                    continue
+            conn = pool.acquire()
+            try:
+                results[key] = func(conn)
+            except Exception:
+                with lock:
+                    errors[index] = sys.exc_info()
+            finally:
+                pool.release(conn)
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(workers, len(tasks)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        first = min(errors)
+        for key, _ in tasks[first:]:
+            results.pop(key, None)
+        reraise(*errors[first])
+    return results
+
+def cups_fill_result(result, printers, gathered):
+    """Fill result from the gathered tasks, in serial mode order.
+
+    After an error only the tasks before the failing one are in gathered;
+    the printer whose attributes failed is left empty like the serial
+    loop always did.
+    """
+    for printer in printers:
+        key = ('printer', printer)
+        if key not in gathered:
+            result['printers'][printer] = dict()
+            break
+        result['printers'][printer] = cups_printer_info(
+            printers[printer], gathered[key])
+    for key in ['ppds', 'devices', 'dests', 'default']:
+        if key in gathered:
+            result[key] = gathered[key]
+
+def cups_printer_info(attrs, print_attr):
+    """Build the info dict of a printer from getPrinters and its attributes"""
+    info = dict()
+    info['status'] = printer_state[attrs["printer-state"]]
+    info['raw'] = \
+        bool(attrs["printer-make-and-model"].find('Raw Printer') != -1)
+    for items in print_arg:
+        info[items[0]] = attrs[items[1]]
+    for items in print_attr_arg:
+        if items[1] in print_attr:
+            info[items[0]] = print_attr[items[1]]
+        else:
+            info[items[0]] = items[2]
+    return info
+
+def cups_attributes_task(printer):
+    """Return a task fetching the attributes of printer"""
+    return lambda conn: conn.getPrinterAttributes(name=printer)
+
 def run_module():
-    printer_state = ['Unknown0', 'Unknown1', 'Unknown2',
-                     'Idle', 'Processing', 'Stopped']
 
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        user=dict(type='str', required=False, default='')
+        user=dict(type='str', required=False, default=''),
+        workers=dict(type='int', required=False, default=1)
     )
 
     # seed the result dict in the object
@@ -102,8 +283,15 @@ def run_module():
     if not HAS_CUPS:
         module.fail_json(msg='The cups python module is required')
 
+    workers = module.params['workers']
+    if workers < 1 or workers > MAX_WORKERS:
+        module.fail_json(msg='workers must be between 1 and %d'
+                         % MAX_WORKERS)
+
     # manipulate or modify the state as needed (this is going to be the
     # part where your module will do what it needs to do)
+    printers = dict()
+    gathered = dict()
     try:
         if module.params['user']:
             cups.setUser(module.params['user'])
@@ -111,45 +299,22 @@ def run_module():
         conn = cups.Connection()
         # Get CUPS Printers
         printers = conn.getPrinters()
-        print_arg = [
-            ['status_message', 'printer-state-message'],
-            ['location', 'printer-location'],
-            ['info', 'printer-info'],
-            ['type', 'printer-type'],
-            ['shared', 'printer-is-shared'],
-            ['uri', 'device-uri'],
-            ['model', 'printer-make-and-model']
-        ]
-        print_attr_arg = [
-            ['color', 'color-supported', False],
-            ['duplex', 'sides-supported', ['one-sided']],
-            ['media_default', 'media-default', ''],
-            ['op_policy', 'printer-op-policy', 'default'],
-            ['error_policy', 'printer-error-policy', 'stop-printer']
+        # Attributes of every printer and the server-wide lists are
+        # independent requests, they can be done concurrently
+        tasks = [(('printer', printer), cups_attributes_task(printer))
+                 for printer in printers]
+        tasks += [
+            ('ppds', lambda c: c.getPPDs()),
+            ('devices', lambda c: c.getDevices()),
+            ('dests', lambda c: c.getDests()),
+            ('default', lambda c: c.getDefault())
         ]
-        # Fill the blanks for printers
-        for printer in printers:
-            result['printers'][printer] = dict()
-            print_attr = conn.getPrinterAttributes(name=printer)
-            result['printers'][printer]['status'] = \
-                printer_state[printers[printer]["printer-state"]]
-            result['printers'][printer]['raw'] = \
-                bool(printers[printer]["printer-make-and-model"].find('Raw Printer') != -1)
-            for items in print_arg:
-                result['printers'][printer][items[0]] = \
-                    printers[printer][items[1]]
-            for items in print_attr_arg:
-                if items[1] in print_attr:
-                    result['printers'][printer][items[0]] = \
-                        print_attr[items[1]]
-                else:
-                    result['printers'][printer][items[0]] = items[2]
-
-        result['ppds'] = conn.getPPDs()
-        result['devices'] = conn.getDevices()
-        result['dests'] = conn.getDests()
-        result['default'] = conn.getDefault()
+        pool = CupsConnectionPool(conn, min(workers, len(tasks)))
+        cups_run_tasks(pool, workers, tasks, module.params['user'], gathered)
+        # Fill the blanks for printers, in getPrinters order
+        cups_fill_result(result, printers, gathered)
     except cups.IPPError:
+        cups_fill_result(result, printers, gathered)
         module.fail_json(msg='Error in cups_info module', **result)
 
     # in the event of a successful module execution, you will want to
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+# Copyright: (c) 2019-2022, Robert Pouliot <krynos42@gmail.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Compare serial and concurrent cups_info against a slow fake CUPS server.
+
+Run from the top of the repository, with ansible installed:
+
+    python tests/bench_cups_info.py
+
+For every scenario the output of workers=1 must be byte-identical to the
+output of every other worker count, every request must be sent as the
+configured user and no more connections may be opened than workers.
+The wall-clock time of each run is printed.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import fake_cups
+sys.modules['cups'] = fake_cups
+
+from ansible.module_utils import basic
+import cups_info
+
+WORKERS = [1, 4, 8]
+
+# (name, failing requests, max connections accepted by the server)
+SCENARIOS = [
+    ('success', set(), None),
+    ('printer attributes failure', set(['getPrinterAttributes:p3',
+                                        'getPrinterAttributes:p7']), None),
+    ('getDests failure', set(['getDests', 'getDefault']), None),
+    ('single connection server', set(), 1),
+    ('two connections server', set(['getPPDs']), 2),
+]
+
+
+@contextlib.contextmanager
+def module_args(args):
+    try:
+        from ansible.module_utils.testing import patch_module_args
+    except ImportError:
+        old = basic._ANSIBLE_ARGS
+        basic._ANSIBLE_ARGS = json.dumps(
+            dict(ANSIBLE_MODULE_ARGS=args)).encode('utf-8')
+        try:
+            yield
+        finally:
+            basic._ANSIBLE_ARGS = old
+    else:
+        with patch_module_args(args):
+            yield
+
+
+def run(user, workers):
+    fake_cups.reset()
+    fake_cups.setUser(None)
+    out = io.StringIO()
+    start = time.time()
+    with module_args(dict(user=user, workers=workers)):
+        with contextlib.redirect_stdout(out):
+            try:
+                cups_info.run_module()
+            except SystemExit:
+                pass
+    elapsed = time.time() - start
+    output = json.loads(out.getvalue())
+    # invocation echoes the workers option back, leave it out
+    output.pop('invocation', None)
+    output = json.dumps(output, sort_keys=True)
+    return output, elapsed
+
+
+def main():
+    failed = False
+    for name, fail, max_connections in SCENARIOS:
+        fake_cups.fail = fail
+        fake_cups.max_connections = max_connections
+        for user in ['', 'admin']:
+            expected = None
+            for workers in WORKERS:
+                output, elapsed = run(user, workers)
+                users = set(u for r, u in fake_cups.requests)
+                print('%-28s user=%-6s workers=%d %.2fs connections=%d'
+                      % (name, user or '-', workers, elapsed,
+                         len(fake_cups.connections)))
+                if expected is None:
+                    expected = output
+                elif output != expected:
+                    print('  output differs from workers=1')
+                    failed = True
+                if users != set([user or None]):
+                    print('  requests sent as %s' % sorted(users, key=str))
+                    failed = True
+                if len(fake_cups.connections) > workers:
+                    print('  too many connections opened')
+                    failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
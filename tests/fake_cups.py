@@ -0,0 +1,92 @@
+# Copyright: (c) 2019-2022, Robert Pouliot <krynos42@gmail.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Stand-in for the pycups module with simulated server latency.
+
+Like libcups, the user set with setUser() is kept per thread.  Every
+request records the user it was sent as, so callers can check that all
+threads talk to CUPS as the same user.
+"""
+
+import threading
+import time
+
+# Seconds spent in every request, as if the server was remote
+latency = 0.05
+# Number of queues returned by getPrinters()
+nb_printers = 10
+# Names of requests that raise IPPError, e.g. 'getDests' or
+# 'getPrinterAttributes:p3'
+fail = set()
+# Connections the server accepts before refusing new ones, None for no
+# limit, like CUPS MaxClientsPerHost
+max_connections = None
+
+requests = []
+connections = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class IPPError(Exception):
+    pass
+
+
+def setUser(user):
+    _local.user = user
+
+
+def reset():
+    del requests[:]
+    del connections[:]
+
+
+class Connection(object):
+
+    def __init__(self):
+        with _lock:
+            if max_connections is not None and \
+                    len(connections) >= max_connections:
+                raise RuntimeError('failed to connect')
+            connections.append(self)
+
+    def _request(self, name, value):
+        with _lock:
+            requests.append((name, getattr(_local, 'user', None)))
+        time.sleep(latency)
+        if name in fail:
+            raise IPPError(0, name)
+        return value
+
+    def getPrinters(self):
+        printers = dict()
+        for i in range(nb_printers):
+            printers['p%d' % i] = {
+                'printer-state': 3 + i % 3,
+                'printer-state-message': '',
+                'printer-location': 'room %d' % i,
+                'printer-info': 'Printer %d' % i,
+                'printer-type': 4096,
+                'printer-is-shared': bool(i % 2),
+                'device-uri': 'socket://10.0.0.%d:9100' % i,
+                'printer-make-and-model':
+                    'Local Raw Printer' if i % 4 == 0 else 'HP LaserJet'
+            }
+        return self._request('getPrinters', printers)
+
+    def getPrinterAttributes(self, name):
+        attrs = {'color-supported': name.endswith('1'),
+                 'media-default': 'letter'}
+        return self._request('getPrinterAttributes:' + name, attrs)
+
+    def getPPDs(self):
+        return self._request('getPPDs', {'raw': {'ppd-make': 'Raw'}})
+
+    def getDevices(self):
+        return self._request('getDevices', {'socket': {'device-class': 'network'}})
+
+    def getDests(self):
+        return self._request('getDests', {'p0,None': 'p0'})
+
+    def getDefault(self):
+        return self._request('getDefault', 'p0')